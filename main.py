@@ -1,30 +1,54 @@
 #!/usr/bin/env python3
 import asyncio
+import atexit
 import click
 import logging
+import logging.handlers
+import queue
 import uvicorn
 import uuid
 import sys
+from urllib.parse import urlsplit
 from src.config import settings
 from src.agent import Agent
 from src.coordinator import Coordinator
 from src.monitoring import MonitoringApp
 
+# Install uvloop as the event loop for all modes (agent, coordinator).
+# Drop-in replacement for asyncio's loop; asyncio.run() picks it up.
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
 # Configure logging based on mode
 def setup_logging(mode: str):
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
     if mode == 'monitoring':
         # For monitoring mode, disable all logging or redirect to file
-        logging.basicConfig(
-            level=logging.CRITICAL,  # Only show critical errors
-            filename='/tmp/http-dispatcher-monitoring.log',
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
+        level = logging.CRITICAL  # Only show critical errors
+        real_handler = logging.FileHandler('/tmp/http-dispatcher-monitoring.log')
     else:
         # For other modes, use normal console logging
-        logging.basicConfig(
-            level=getattr(logging, settings.log_level),
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
+        level = getattr(logging, settings.log_level)
+        real_handler = logging.StreamHandler()
+
+    real_handler.setFormatter(formatter)
+
+    # Route log records through a queue so the actual I/O happens on a
+    # background thread instead of blocking the event loop on every write
+    log_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(
+        log_queue, real_handler, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
 
 logger = logging.getLogger(__name__)
 
@@ -38,7 +62,11 @@ logger = logging.getLogger(__name__)
 @click.option('--host', default='0.0.0.0', help='Host to bind the coordinator to')
 @click.option('--port', default=8000, type=int, help='Port to bind the coordinator to')
 @click.option('--bind', multiple=True, help='Additional bind addresses in format host:port (can be used multiple times)')
-def main(mode, coordinator_url, agent_id, host, port, bind):
+@click.option('--workers', default=1, type=int,
+              help='Number of coordinator worker processes. With more than one worker, '
+                   'agent registry and IP pool state are per-worker (no shared store), '
+                   'and additional --bind addresses are not supported.')
+def main(mode, coordinator_url, agent_id, host, port, bind, workers):
     """HTTP Dispatcher - Distributed HTTP request system with IPv6 support"""
     
     # Setup logging based on mode
@@ -46,31 +74,48 @@ def main(mode, coordinator_url, agent_id, host, port, bind):
     
     if mode == 'coordinator':
         logger.info("Starting Coordinator mode")
+
+        if workers > 1:
+            if bind:
+                logger.error("--workers > 1 cannot be combined with additional --bind addresses")
+                sys.exit(1)
+            logger.info(f"Starting {workers} coordinator workers on {host}:{port}")
+            uvicorn.run(
+                "src.coordinator:app_factory",
+                host=host,
+                port=port,
+                workers=workers,
+                factory=True,
+                loop="uvloop",
+                http="httptools",
+                ws="websockets",
+                ws_per_message_deflate=False,
+                access_log=False,
+                log_config=None,
+                log_level="warning"
+            )
+            return
+
         coordinator = Coordinator()
         
         # Build list of bind addresses
         bind_addresses = [(host, port)]  # Always include the default host:port
         
-        # Parse additional bind addresses
+        # Parse additional bind addresses; urlsplit handles bracketed
+        # IPv6 literals like [::1]:8000 that a naive rsplit(':') would not
         for bind_addr in bind:
             try:
-                if ':' in bind_addr:
-                    bind_host, bind_port = bind_addr.rsplit(':', 1)
-                    bind_addresses.append((bind_host, int(bind_port)))
-                else:
-                    # If no port specified, use the same port as default
-                    bind_addresses.append((bind_addr, port))
+                parts = urlsplit(f"//{bind_addr}")
+                if parts.hostname is None:
+                    raise ValueError("no host specified")
+                # If no port specified, use the same port as default
+                bind_addresses.append((parts.hostname, parts.port or port))
             except ValueError as e:
                 logger.error(f"Invalid bind address '{bind_addr}': {e}")
                 sys.exit(1)
-        
+
         # Remove duplicates while preserving order
-        seen = set()
-        unique_bind_addresses = []
-        for addr in bind_addresses:
-            if addr not in seen:
-                seen.add(addr)
-                unique_bind_addresses.append(addr)
+        unique_bind_addresses = list(dict.fromkeys(bind_addresses))
         
         asyncio.run(coordinator.start_servers(unique_bind_addresses))
     
@@ -2,16 +2,46 @@ import asyncio
 import socket
 import platform
 import httpx
-import json
+import orjson
 import random
-from typing import List, Optional
+import re
+import time
+from typing import List, Optional, Tuple
 from datetime import datetime
 import websockets
 import logging
-from src.models import HTTPRequestConfig, RequestResult, AgentRegistration, AgentHeartbeat
+from pydantic import TypeAdapter
+from src.models import HTTPRequestConfig, RequestResult, AgentRegistration
 
 logger = logging.getLogger(__name__)
 
+# Compiled once at import; validate_python is pydantic v2's fast path
+_CFG_ADAPTER = TypeAdapter(HTTPRequestConfig)
+
+# Non-global IPv6 prefixes rejected in one match instead of a cascade of
+# startswith checks: link-local (fe80::/10), ULA (fc00::/7), multicast
+# (ff00::/8), loopback, IPv4-mapped, documentation (2001:db8::/32)
+_IPV6_REJECT_RE = re.compile(r'^(?:fe[89ab]|f[cd]|ff|::1$|::ffff:|2001:db8:)')
+
+# How long discovered IPv6 addresses stay valid before re-enumeration
+IPV6_CACHE_TTL = 300.0
+
+# Reconnect backoff caps: 1s doubling up to 256s, clamped at 5 minutes
+_BACKOFF_TABLE = tuple(min(1.0 * (2 ** i), 300.0) for i in range(9))
+
+
+def _is_global_ipv6(ip: str) -> bool:
+    """Check if an IPv6 address is a global unicast address"""
+    # Remove scope id if present
+    ip = ip.split('%', 1)[0].lower()
+
+    if not ip or _IPV6_REJECT_RE.match(ip):
+        return False
+
+    # Global unicast addresses live in 2000::/3 (2000:: - 3fff::);
+    # anything else is conservatively rejected
+    return ip[0] in '23'
+
 
 class Agent:
     def __init__(self, agent_id: str, coordinator_url: str):
@@ -23,45 +53,55 @@ class Agent:
         self.running = False
         self.reconnect_attempts = 0
         self.max_reconnect_attempts = None  # Unlimited retries
-        self.base_retry_delay = 1.0  # Start with 1 second
-        self.max_retry_delay = 300.0  # Max 5 minutes
-        
-    def get_ipv6_addresses(self) -> List[str]:
+        self._ipv6_cache: Optional[Tuple[float, List[str]]] = None
+        # One pooled client per source IP so keepalive connections are
+        # reused across requests instead of handshaking every time
+        self._clients: dict = {}
+        self._registration_client: Optional[httpx.AsyncClient] = None
+        self._outbox: Optional[asyncio.Queue] = None
+        # In-flight command tasks; bounded so a flood of execute_request
+        # commands can't grow the task set without limit
+        self._inflight: set = set()
+        self._sem = asyncio.Semaphore(100)
+        # Static heartbeat fields, precomputed once
+        self._hb_static = {"agent_id": self.agent_id, "status": "active"}
+        # Last heartbeat actually sent; frames go out only on address
+        # change or when the refresh interval elapses
+        self._last_hb_addresses: Optional[List[str]] = None
+        self._last_hb_time = 0.0
+        # Command dispatch table; O(1) lookup instead of an if/elif chain
+        self._handlers = {
+            "configure_request": self._handle_configure_request,
+            "execute_request": self._handle_execute_request,
+            "ping": self._handle_ping,
+        }
+
+    def get_client(self, source_ip: str) -> httpx.AsyncClient:
+        client = self._clients.get(source_ip)
+        if client is None:
+            client = httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(local_address=source_ip),
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
+            )
+            self._clients[source_ip] = client
+        return client
+
+    async def get_ipv6_addresses(self) -> List[str]:
+        # Serve from cache so heartbeats don't fork `ip` / walk interfaces
+        # every 30 seconds; discovery runs in a thread to keep the loop free
+        if self._ipv6_cache and time.monotonic() - self._ipv6_cache[0] < IPV6_CACHE_TTL:
+            return self._ipv6_cache[1]
+
+        addresses = await asyncio.to_thread(self._discover_ipv6_addresses)
+        self._ipv6_cache = (time.monotonic(), addresses)
+        return addresses
+
+    def _discover_ipv6_addresses(self) -> List[str]:
+        """Blocking interface enumeration; the socket-connect and
+        getaddrinfo fallbacks can stall on DNS, so only call this via
+        asyncio.to_thread (see get_ipv6_addresses)."""
         ipv6_addresses = []
         
-        def is_global_ipv6(ip: str) -> bool:
-            """Check if an IPv6 address is a global unicast address"""
-            # Remove scope id if present
-            ip = ip.split('%')[0]
-            
-            # Filter out non-global addresses
-            # Link-local: fe80::/10
-            if ip.startswith('fe80:') or ip.startswith('fe8') or ip.startswith('fe9') or ip.startswith('fea') or ip.startswith('feb'):
-                return False
-            # Loopback: ::1/128
-            if ip == '::1' or ip.startswith('::1/'):
-                return False
-            # Unique Local Addresses (ULA): fc00::/7 (fc00:: - fdff::)
-            if ip.startswith('fc') or ip.startswith('fd'):
-                return False
-            # Multicast: ff00::/8
-            if ip.startswith('ff'):
-                return False
-            # Documentation: 2001:db8::/32
-            if ip.startswith('2001:db8:'):
-                return False
-            # IPv4-mapped IPv6: ::ffff:0:0/96
-            if ip.startswith('::ffff:'):
-                return False
-            
-            # Check if it starts with 2 or 3 (global unicast range)
-            # Global unicast addresses typically start with 2000::/3 (2000:: - 3fff::)
-            if ip.startswith('2') or ip.startswith('3'):
-                return True
-            
-            # Some global addresses might not start with 2 or 3, but let's be conservative
-            return False
-        
         try:
             # Method 1: Try using netifaces if available
             try:
@@ -71,23 +111,20 @@ class Agent:
                     if netifaces.AF_INET6 in addrs:
                         for addr_info in addrs[netifaces.AF_INET6]:
                             ip = addr_info['addr'].split('%')[0]  # Remove scope id if present
-                            if is_global_ipv6(ip):
+                            if _is_global_ipv6(ip):
                                 ipv6_addresses.append(ip)
             except ImportError:
-                # Method 2: Try using ip command (Linux)
-                import subprocess
+                # Method 2: Try psutil (C-backed getifaddrs, no fork/exec
+                # like the old `ip -6 addr` subprocess approach)
                 try:
-                    result = subprocess.run(['ip', '-6', 'addr', 'show', 'scope', 'global'], 
-                                         capture_output=True, text=True, timeout=5)
-                    if result.returncode == 0:
-                        import re
-                        # Parse IPv6 addresses from ip command output
-                        pattern = r'inet6\s+([0-9a-fA-F:]+)/\d+'
-                        matches = re.findall(pattern, result.stdout)
-                        for ip in matches:
-                            if is_global_ipv6(ip):
-                                ipv6_addresses.append(ip)
-                except (subprocess.SubprocessError, FileNotFoundError):
+                    import psutil
+                    for addrs in psutil.net_if_addrs().values():
+                        for addr_info in addrs:
+                            if addr_info.family == socket.AF_INET6:
+                                ip = addr_info.address.split('%')[0]  # Remove scope id if present
+                                if _is_global_ipv6(ip):
+                                    ipv6_addresses.append(ip)
+                except ImportError:
                     # Method 3: Fall back to socket method but with better handling
                     try:
                         # Try to get all addresses by connecting to an external host
@@ -95,13 +132,13 @@ class Agent:
                             # Use Google's public DNS IPv6
                             s.connect(('2001:4860:4860::8888', 80))
                             local_ip = s.getsockname()[0]
-                            if local_ip and is_global_ipv6(local_ip):
+                            if local_ip and _is_global_ipv6(local_ip):
                                 ipv6_addresses.append(local_ip)
                     except:
                         # Last resort: try hostname resolution
                         for info in socket.getaddrinfo(socket.gethostname(), None, socket.AF_INET6):
                             ip = info[4][0]
-                            if is_global_ipv6(ip):
+                            if _is_global_ipv6(ip):
                                 ipv6_addresses.append(ip)
         except Exception as e:
             logger.error(f"Error getting IPv6 addresses: {e}")
@@ -117,81 +154,77 @@ class Agent:
         if not unique_addresses:
             logger.warning("No IPv6 addresses found, using ::1 as fallback")
             unique_addresses = ["::1"]
-        else:
-            logger.info(f"Found IPv6 addresses: {unique_addresses}")
+        elif logger.isEnabledFor(logging.DEBUG):
+            # Runs on every heartbeat; keep it out of INFO output
+            logger.debug(f"Found IPv6 addresses: {unique_addresses}")
         
         return unique_addresses
     
     def get_retry_delay(self) -> float:
         if self.reconnect_attempts == 0:
             return 0  # First attempt should be immediate
-        
-        # Exponential backoff with jitter: base * (2 ^ attempts) + random jitter
-        delay = self.base_retry_delay * (2 ** min(self.reconnect_attempts - 1, 8))  # Cap at 2^8
-        delay = min(delay, self.max_retry_delay)
-        
-        # Add jitter (±25% of delay)
-        jitter = delay * 0.25 * (2 * random.random() - 1)
-        delay += jitter
-        
-        return max(0, delay)
+
+        # Full jitter: pick uniformly in [0, cap] so agents reconnecting
+        # after a coordinator restart spread out instead of herding
+        cap = _BACKOFF_TABLE[min(self.reconnect_attempts - 1, len(_BACKOFF_TABLE) - 1)]
+        return random.uniform(0, cap)
     
     async def register_with_coordinator(self):
         registration = AgentRegistration(
             agent_id=self.agent_id,
             hostname=self.hostname,
-            ipv6_addresses=self.get_ipv6_addresses()
+            ipv6_addresses=await self.get_ipv6_addresses()
         )
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.coordinator_url}/api/agents/register",
-                    json=registration.model_dump()
-                )
-                if response.status_code == 200:
-                    logger.info(f"Successfully registered with coordinator")
-                    return True
-                else:
-                    logger.error(f"Failed to register: {response.text}")
-                    return False
+            if self._registration_client is None:
+                self._registration_client = httpx.AsyncClient()
+            response = await self._registration_client.post(
+                f"{self.coordinator_url}/api/agents/register",
+                json=registration.model_dump()
+            )
+            if response.status_code == 200:
+                logger.info(f"Successfully registered with coordinator")
+                return True
+            else:
+                logger.error(f"Failed to register: {response.text}")
+                return False
         except Exception as e:
             logger.error(f"Error registering with coordinator: {e}")
             return False
     
     async def execute_request(self, source_ip: str, config: Optional[dict] = None) -> RequestResult:
+        # Build metadata once; every return path below shares it
+        metadata = {
+            "agent_id": self.agent_id,
+            "source_ip": source_ip,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
         # Use provided config or fall back to stored config
         request_config = None
         if config:
             try:
-                request_config = HTTPRequestConfig(**config)
+                request_config = _CFG_ADAPTER.validate_python(config)
             except Exception as e:
                 return RequestResult(
                     success=False,
                     error=f"Invalid request configuration: {e}",
-                    metadata={
-                        "agent_id": self.agent_id,
-                        "source_ip": source_ip,
-                        "timestamp": datetime.utcnow().isoformat()
-                    }
+                    metadata=metadata
                 )
         else:
             request_config = self.request_config
-        
+
         if not request_config:
             return RequestResult(
                 success=False,
                 error="No request configuration available",
-                metadata={
-                    "agent_id": self.agent_id,
-                    "source_ip": source_ip,
-                    "timestamp": datetime.utcnow().isoformat()
-                }
+                metadata=metadata
             )
         
         try:
-            transport = httpx.AsyncHTTPTransport(local_address=source_ip)
-            
+            client = self.get_client(source_ip)
+
             # Prepare request body
             request_data = None
             request_json = None
@@ -203,120 +236,125 @@ class Agent:
                 elif isinstance(request_config.body, str):
                     # Try to parse string as JSON, otherwise send as text
                     try:
-                        parsed_body = json.loads(request_config.body)
+                        parsed_body = orjson.loads(request_config.body)
                         request_json = parsed_body
-                    except json.JSONDecodeError:
+                    except orjson.JSONDecodeError:
                         request_data = request_config.body
                 else:
                     request_data = request_config.body
             
-            async with httpx.AsyncClient(transport=transport) as client:
-                response = await client.request(
-                    method=request_config.method,
-                    url=request_config.url,
-                    headers=request_config.headers,
-                    params=request_config.params,
-                    json=request_json,
-                    data=request_data,
-                    timeout=request_config.timeout
-                )
-                
-                # Try to parse response as JSON
-                response_body = response.text
-                is_json = False
-                
-                if response_body:
-                    try:
-                        parsed_response = json.loads(response_body)
-                        response_body = parsed_response
-                        is_json = True
-                    except json.JSONDecodeError:
-                        # Keep as text if not valid JSON
-                        pass
-                
-                return RequestResult(
-                    success=True,
-                    status_code=response.status_code,
-                    headers=dict(response.headers),
-                    body=response_body,
-                    is_json=is_json,
-                    metadata={
-                        "agent_id": self.agent_id,
-                        "source_ip": source_ip,
-                        "timestamp": datetime.utcnow().isoformat()
-                    }
-                )
+            response = await client.request(
+                method=request_config.method,
+                url=request_config.url,
+                headers=request_config.headers,
+                params=request_config.params,
+                json=request_json,
+                data=request_data,
+                timeout=request_config.timeout
+            )
+
+            # Try to parse response as JSON
+            response_body = response.text
+            is_json = False
+
+            if response_body:
+                try:
+                    parsed_response = orjson.loads(response_body)
+                    response_body = parsed_response
+                    is_json = True
+                except orjson.JSONDecodeError:
+                    # Keep as text if not valid JSON
+                    pass
+
+            return RequestResult(
+                success=True,
+                status_code=response.status_code,
+                headers=dict(response.headers),
+                body=response_body,
+                is_json=is_json,
+                metadata=metadata
+            )
         except Exception as e:
             return RequestResult(
                 success=False,
                 error=str(e),
-                metadata={
-                    "agent_id": self.agent_id,
-                    "source_ip": source_ip,
-                    "timestamp": datetime.utcnow().isoformat()
-                }
+                metadata=metadata
             )
     
+    async def _handle_configure_request(self, data: dict) -> dict:
+        self.request_config = _CFG_ADAPTER.validate_python(data.get("config", {}))
+        logger.info("Request configuration updated")
+        return {"status": "success", "message": "Configuration updated"}
+
+    async def _handle_execute_request(self, data: dict) -> dict:
+        source_ip = data.get("source_ip")
+        config = data.get("config")  # Support custom config per request
+        result = await self.execute_request(source_ip, config)
+        return result.model_dump()
+
+    async def _handle_ping(self, data: dict) -> dict:
+        return {"status": "pong", "agent_id": self.agent_id}
+
     async def handle_message(self, message: str):
         try:
-            data = json.loads(message)
+            data = orjson.loads(message)
             command = data.get("command")
             request_id = data.get("request_id")
             logger.debug(f"Agent {self.agent_id} received command: {command} (request_id: {request_id})")
-            
-            if command == "configure_request":
-                self.request_config = HTTPRequestConfig(**data.get("config", {}))
-                logger.info("Request configuration updated")
-                response = {"status": "success", "message": "Configuration updated"}
-                if request_id:
-                    response["request_id"] = request_id
-                return response
-            
-            elif command == "execute_request":
-                source_ip = data.get("source_ip")
-                config = data.get("config")  # New: support custom config per request
-                result = await self.execute_request(source_ip, config)
-                result_dict = result.model_dump()
-                if request_id:
-                    result_dict["request_id"] = request_id
-                return result_dict
-            
-            elif command == "ping":
-                response = {"status": "pong", "agent_id": self.agent_id}
-                if request_id:
-                    response["request_id"] = request_id
-                return response
-            
+
+            handler = self._handlers.get(command)
+            if handler:
+                response = await handler(data)
             else:
                 response = {"status": "error", "message": f"Unknown command: {command}"}
-                if request_id:
-                    response["request_id"] = request_id
-                return response
-                
+
+            if request_id:
+                response["request_id"] = request_id
+            return response
+
         except Exception as e:
             logger.error(f"Error handling message: {e}")
             return {"status": "error", "message": str(e)}
     
     async def send_heartbeat(self):
-        heartbeat = AgentHeartbeat(
-            agent_id=self.agent_id,
-            ipv6_addresses=self.get_ipv6_addresses(),
-            status="active"
-        )
-        
-        if self.ws_connection:
-            try:
-                await self.ws_connection.send(json.dumps({
-                    "type": "heartbeat",
-                    "data": heartbeat.model_dump()
-                }))
-            except websockets.exceptions.ConnectionClosed:
-                logger.warning("Cannot send heartbeat: WebSocket connection closed")
-                raise  # Re-raise to trigger reconnection
-            except Exception as e:
-                logger.error(f"Error sending heartbeat: {e}")
-                raise  # Re-raise to trigger reconnection
+        # Payload shape is constant except for the address list; fill in
+        # the template instead of building+dumping a pydantic model per beat
+        data = dict(self._hb_static)
+        data["ipv6_addresses"] = await self.get_ipv6_addresses()
+
+        if self.ws_connection and self._outbox is not None:
+            self._outbox.put_nowait({
+                "type": "heartbeat",
+                "data": data
+            })
     
+    async def _dispatch(self, message: str):
+        """Handle one command concurrently and queue its reply."""
+        async with self._sem:
+            response = await self.handle_message(message)
+        if self._outbox is not None:
+            self._outbox.put_nowait(response)
+
+    async def _sender_loop(self, websocket):
+        """Drain the outbox, coalescing bursts into a single array frame.
+
+        Replies and heartbeats queued within a short window ship as one
+        WebSocket frame instead of one send per message. The coordinator
+        accepts both single objects and arrays.
+        """
+        while True:
+            batch = [await self._outbox.get()]
+            while len(batch) < 64:
+                try:
+                    batch.append(await asyncio.wait_for(self._outbox.get(), timeout=0.002))
+                except asyncio.TimeoutError:
+                    break
+
+            payload = batch[0] if len(batch) == 1 else batch
+            # orjson emits bytes; ship them as a binary frame so the
+            # coordinator can parse without a UTF-8 transcode
+            await websocket.send(orjson.dumps(payload))
+
     async def websocket_handler(self):
         ws_url = self.coordinator_url.replace("http://", "ws://").replace("https://", "wss://")
         ws_url = f"{ws_url}/ws/agent/{self.agent_id}"
@@ -334,31 +372,48 @@ class Agent:
                     break
                 
                 logger.info(f"Attempting to connect to coordinator (attempt {self.reconnect_attempts})")
-                async with websockets.connect(ws_url, ping_interval=20, ping_timeout=10) as websocket:
+                async with websockets.connect(
+                    ws_url,
+                    ping_interval=20,
+                    ping_timeout=10,
+                    compression=None,  # frames are small JSON; deflate costs more CPU than it saves
+                    max_size=8 * 1024 * 1024,
+                    read_limit=2 ** 18,
+                    write_limit=2 ** 18
+                ) as websocket:
                     self.ws_connection = websocket
                     self.reconnect_attempts = 0  # Reset on successful connection
                     logger.info(f"Connected to coordinator via WebSocket")
-                    
+
                     # Re-register when reconnecting
                     if not await self.register_with_coordinator():
                         logger.warning("Failed to re-register after reconnection")
-                    
+
+                    # Fresh outbox per connection; stale replies from a dead
+                    # connection must not leak into the new one
+                    self._outbox = asyncio.Queue()
+                    sender_task = asyncio.create_task(self._sender_loop(websocket))
                     heartbeat_task = asyncio.create_task(self.heartbeat_loop())
-                    
+
                     try:
                         async for message in websocket:
-                            response = await self.handle_message(message)
-                            await websocket.send(json.dumps(response))
+                            # Dispatch concurrently so a slow execute_request
+                            # doesn't block receipt of the next command
+                            task = asyncio.create_task(self._dispatch(message))
+                            self._inflight.add(task)
+                            task.add_done_callback(self._inflight.discard)
                     except websockets.exceptions.ConnectionClosed:
                         logger.warning("WebSocket connection closed by coordinator")
                     except Exception as e:
                         logger.error(f"Error in WebSocket message handling: {e}")
                     finally:
-                        heartbeat_task.cancel()
-                        try:
-                            await heartbeat_task
-                        except asyncio.CancelledError:
-                            pass
+                        for task in (heartbeat_task, sender_task):
+                            task.cancel()
+                            try:
+                                await task
+                            except asyncio.CancelledError:
+                                pass
+                        self._outbox = None
                         
             except websockets.exceptions.InvalidURI:
                 logger.error(f"Invalid WebSocket URL: {ws_url}")
@@ -374,9 +429,18 @@ class Agent:
             self.ws_connection = None
     
     async def heartbeat_loop(self):
+        # The websocket's own ping/pong (ping_interval=20) covers liveness,
+        # so heartbeat frames only carry address updates: send when the
+        # IPv6 list changes, or every 5 minutes as a refresh
         while self.running:
             try:
-                await self.send_heartbeat()
+                addresses = await self.get_ipv6_addresses()
+                now = time.monotonic()
+                if (addresses != self._last_hb_addresses
+                        or now - self._last_hb_time >= 300):
+                    await self.send_heartbeat()
+                    self._last_hb_addresses = list(addresses)
+                    self._last_hb_time = now
                 await asyncio.sleep(30)
             except (websockets.exceptions.ConnectionClosed, ConnectionError, OSError):
                 logger.warning("Heartbeat failed due to connection issue")
@@ -402,5 +466,18 @@ class Agent:
     
     async def stop(self):
         self.running = False
+
+        # Let in-flight commands finish before tearing down connections
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
         if self.ws_connection:
-            await self.ws_connection.close()
\ No newline at end of file
+            await self.ws_connection.close()
+
+        # Close pooled HTTP clients
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+        if self._registration_client:
+            await self._registration_client.aclose()
+            self._registration_client = None
\ No newline at end of file
@@ -12,6 +12,9 @@ class Settings(BaseSettings):
     agent_id: Optional[str] = None
     
     log_level: str = "INFO"
+
+    # Max request history entries kept in memory on the coordinator
+    history_max: int = 1000
     
     class Config:
         env_prefix = "DISPATCHER_"
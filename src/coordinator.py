@@ -1,14 +1,22 @@
 import asyncio
-import json
+import heapq
+import orjson
+import re
+import time
 import uuid
 import uvicorn
+from dataclasses import asdict
 from typing import Dict, List, Optional, Tuple
-from datetime import datetime, timedelta
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
-from fastapi.responses import JSONResponse, Response
+from datetime import datetime
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 import logging
 from collections import deque
-from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
+from itertools import islice
+from bisect import bisect_left
+from prometheus_client import Counter, Gauge, generate_latest, CONTENT_TYPE_LATEST, REGISTRY
+from prometheus_client.core import CounterMetricFamily, HistogramMetricFamily
+from src.config import settings
 from src.models import (
     AgentInfo, HTTPRequestConfig, RequestResult, 
     AgentRegistration, IPStatus, ExecuteRequest
@@ -16,18 +24,136 @@ from src.models import (
 
 logger = logging.getLogger(__name__)
 
+# Pulls the request_id out of a response frame without parsing the JSON
+_RID_RE = re.compile(rb'"request_id"\s*:\s*"([^"]+)"')
+
+# Histogram bucket upper bounds (le); the last slot in each accumulator
+# list is the +Inf bucket and the one after it the running sum
+_DURATION_BUCKETS = (0.05, 0.25, 1.0, 5.0, 30.0)
+_SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000)
+
+
+class _RequestMetricsCollector:
+    """Exports the coordinator's plain-dict request accumulators.
+
+    Recording on the dispatch path is a dict lookup plus integer adds on a
+    list — no prometheus_client locks or label children. The text-format
+    series are materialized only here, at scrape time.
+    """
+
+    def __init__(self, coordinator: "Coordinator"):
+        self._coordinator = coordinator
+
+    @staticmethod
+    def _histogram_samples(bounds, acc):
+        cumulative = 0
+        buckets = []
+        for le, count in zip(bounds, acc):
+            cumulative += count
+            buckets.append((str(le), cumulative))
+        buckets.append(("+Inf", cumulative + acc[len(bounds)]))
+        return buckets, acc[len(bounds) + 1]
+
+    def collect(self):
+        c = self._coordinator
+
+        total = CounterMetricFamily(
+            'http_dispatcher_requests', 'Total number of requests executed',
+            labels=['agent_id', 'status_class', 'method'])
+        for (agent_id, status_class, method), count in c._req_counts.items():
+            total.add_metric([agent_id, status_class, method], count)
+        yield total
+
+        duration = HistogramMetricFamily(
+            'http_dispatcher_request_duration_seconds',
+            'Request duration in seconds', labels=['method'])
+        for method, acc in c._dur_hist.items():
+            buckets, total_sum = self._histogram_samples(_DURATION_BUCKETS, acc)
+            duration.add_metric([method], buckets, total_sum)
+        yield duration
+
+        size = HistogramMetricFamily(
+            'http_dispatcher_response_size_bytes', 'Response size in bytes')
+        buckets, total_sum = self._histogram_samples(_SIZE_BUCKETS, c._size_hist)
+        size.add_metric([], buckets, total_sum)
+        yield size
+
+
+def app_factory():
+    """ASGI app factory for multi-worker uvicorn (--workers N).
+
+    Each worker process builds its own Coordinator, so agent registry and
+    IP pool state are per-worker. Agents connect via WebSocket to one
+    worker; sharing state across workers requires an external store.
+    """
+    coordinator = Coordinator()
+    app = coordinator.get_app()
+
+    # start_servers() owns the cleanup task in single-worker mode (where
+    # lifespan is off); factory-built workers run with lifespan enabled,
+    # so each starts its own here. Keep a reference so the task isn't
+    # garbage-collected.
+    @app.on_event("startup")
+    async def _start_cleanup():
+        coordinator._cleanup_task = asyncio.create_task(
+            coordinator.cleanup_inactive_agents()
+        )
+
+    return app
+
 
 class Coordinator:
     def __init__(self):
         self.agents: Dict[str, AgentInfo] = {}
         self.agent_connections: Dict[str, WebSocket] = {}
-        self.agent_response_queues: Dict[str, asyncio.Queue] = {}
+        # Fallback buffer for frames that don't match a pending future:
+        # (deque, wake-future) per agent. A plain deque skips asyncio.Queue's
+        # lock and task-tracking bookkeeping on the hot receive path; the
+        # future is set once to wake any waiter, which re-arms by replacing it
+        self.agent_response_buffers: Dict[str, Tuple[deque, asyncio.Future]] = {}
         self.pending_requests: Dict[str, asyncio.Future] = {}  # Track pending requests by ID
-        self.ip_pool: List[IPStatus] = []
+        # Keyed by (agent_id, ip) for O(1) lookup: multiple agents may
+        # legitimately share an address (every agent without global IPv6
+        # registers the ::1 fallback), so the IP alone is not unique
+        self.ip_pool: Dict[Tuple[str, str], IPStatus] = {}
+        self.ips_by_agent: Dict[str, set] = {}
+        # Rotating view of available IPs; O(1) round-robin selection
+        self.available_ips: deque = deque()
+        # Cached endpoint bodies, rebuilt only after registry/pool writes;
+        # the version counter doubles as a weak ETag for conditional GETs
+        self._agents_json: Optional[bytes] = None
+        self._pool_json: Optional[bytes] = None
+        self._stats_json: Optional[bytes] = None
+        self._view_version = 0
+        # Incrementally maintained counters so /api/stats is O(1)
+        self._total_requests = 0
+        self._active_agents = 0
         self.request_config: Optional[HTTPRequestConfig] = None
-        self.round_robin_index = 0
-        self.request_history = deque(maxlen=1000)
-        self.app = FastAPI(title="HTTP Dispatcher Coordinator")
+        # Serialized configure_request frame, rebuilt only when the config changes
+        self._config_bytes: Optional[bytes] = None
+        # Label-bound metric children, keyed by (metric, *labels); .labels()
+        # does a tuple hash + lock acquire per call, so bind once and reuse
+        self._bound_metrics: Dict[tuple, object] = {}
+        # Request IDs: random prefix (so stale responses from before a
+        # restart can't match) + cheap monotonic counter, instead of a
+        # uuid4/os.urandom call per request
+        self._req_id_prefix = uuid.uuid4().hex[:8]
+        self._next_req_id = 0
+        # Serialized config fragment for execute frames; clients typically
+        # repeat the same ExecuteRequest, so memoize the last one
+        self._last_exec_config: Optional[ExecuteRequest] = None
+        self._last_exec_config_frag: bytes = b""
+        self.request_history = deque(maxlen=settings.history_max)
+        # Heap of (deadline, agent_id) expiries so the cleanup task sleeps
+        # until the next candidate instead of scanning every agent each minute
+        self._expiry_heap: list = []
+        # Cleanup task handle; set by start_servers() or the factory's
+        # startup hook, whichever owns the lifecycle
+        self._cleanup_task: Optional[asyncio.Task] = None
+        # orjson for every endpoint that still returns dicts (execute,
+        # register, configure); the hot GET endpoints return cached bytes
+        self.app = FastAPI(title="HTTP Dispatcher Coordinator",
+                           default_response_class=ORJSONResponse)
         self.start_time = datetime.utcnow()
         
         # Prometheus metrics
@@ -36,20 +162,27 @@ class Coordinator:
     
     def setup_metrics(self):
         # Define Prometheus metrics
+        # Label sets are kept coarse on purpose: per-agent × per-status-code
+        # histograms multiply into tens of thousands of series at fleet
+        # scale, bloating /metrics and slowing every observe(). Per-agent
+        # request counts are available from /api/stats.
         self.metrics = {
-            'requests_total': Counter('http_dispatcher_requests_total', 'Total number of requests executed', ['agent_id', 'status_code', 'method']),
-            'requests_duration': Histogram('http_dispatcher_request_duration_seconds', 'Request duration in seconds', ['agent_id', 'method'], buckets=[0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]),
             'agents_connected': Gauge('http_dispatcher_agents_connected', 'Number of connected agents'),
             'agents_total': Gauge('http_dispatcher_agents_total', 'Total number of registered agents'),
             'ip_pool_size': Gauge('http_dispatcher_ip_pool_size', 'Size of the IP pool'),
             'ip_pool_available': Gauge('http_dispatcher_ip_pool_available', 'Number of available IPs in pool'),
             'websocket_connections': Gauge('http_dispatcher_websocket_connections', 'Number of active WebSocket connections'),
             'request_errors': Counter('http_dispatcher_request_errors_total', 'Total number of request errors', ['agent_id', 'error_type']),
-            'agent_requests': Counter('http_dispatcher_agent_requests_total', 'Total requests per agent', ['agent_id']),
-            'response_size_bytes': Histogram('http_dispatcher_response_size_bytes', 'Response size in bytes', ['agent_id'], buckets=[100, 1000, 10000, 100000, 1000000]),
-            'queue_depth': Gauge('http_dispatcher_queue_depth', 'Number of pending requests in queue', ['agent_id']),
             'uptime_seconds': Gauge('http_dispatcher_uptime_seconds', 'Coordinator uptime in seconds'),
         }
+
+        # Request counter and histograms are recorded into plain dicts on
+        # the dispatch path and exported by the custom collector at scrape
+        # time; see _RequestMetricsCollector
+        self._req_counts: Dict[tuple, int] = {}
+        self._dur_hist: Dict[str, list] = {}
+        self._size_hist = [0] * (len(_SIZE_BUCKETS) + 1) + [0.0]
+        REGISTRY.register(_RequestMetricsCollector(self))
     
     def setup_routes(self):
         @self.app.post("/api/agents/register")
@@ -58,13 +191,22 @@ class Coordinator:
                 agent_id=registration.agent_id,
                 hostname=registration.hostname,
                 ipv6_addresses=registration.ipv6_addresses,
-                last_seen=datetime.utcnow(),
+                last_seen=time.time(),
                 status="active"
             )
             
+            old = self.agents.get(registration.agent_id)
+            if old is None or old.status != "active":
+                self._active_agents += 1
             self.agents[registration.agent_id] = agent_info
+            self._schedule_expiry(registration.agent_id, agent_info.last_seen)
             self.update_ip_pool(registration.agent_id, registration.ipv6_addresses)
-            
+
+            # Always invalidate: update_ip_pool short-circuits on an
+            # unchanged address set, but last_seen and a possible
+            # disconnected->active flip still changed the agent view
+            self._invalidate_views()
+
             # Update metrics
             self.update_metrics()
             
@@ -74,58 +216,87 @@ class Coordinator:
         @self.app.websocket("/ws/agent/{agent_id}")
         async def websocket_endpoint(websocket: WebSocket, agent_id: str):
             await websocket.accept()
+
+            # An agent reconnecting after a silent network drop never hit
+            # the disconnect cleanup; unblock anything waiting on the old
+            # buffer and close the stale socket before replacing them
+            if agent_id in self.agent_response_buffers:
+                self._buffer_response(agent_id, b'{"error":"reconnect"}')
+            old_ws = self.agent_connections.get(agent_id)
+            if old_ws is not None:
+                try:
+                    await old_ws.close()
+                except Exception:
+                    pass
+
             self.agent_connections[agent_id] = websocket
+
+            # Bounded deque: a flooding agent overwrites its oldest frames
+            # instead of growing coordinator memory without limit
+            self.agent_response_buffers[agent_id] = (
+                deque(maxlen=256), asyncio.get_running_loop().create_future()
+            )
             
-            # Create a queue for pending responses for this agent
-            self.agent_response_queues[agent_id] = asyncio.Queue()
-            
+            # Run the receive loop as a dedicated reader task; frames in a
+            # burst are classified back-to-back without returning control
+            # to the endpoint coroutine between them
+            reader = asyncio.create_task(self._drain_agent(agent_id, websocket))
+            self.update_metrics()
             try:
-                while True:
-                    data = await websocket.receive_text()
-                    # Check if this is a response to a request
-                    try:
-                        msg = json.loads(data)
-                        if msg.get("type") == "heartbeat":
-                            await self.handle_agent_message(agent_id, data)
-                        else:
-                            # Check if this is a response to a pending request
-                            request_id = msg.get("request_id")
-                            if request_id and request_id in self.pending_requests:
-                                # This is a response to a specific request
-                                future = self.pending_requests[request_id]
-                                if not future.done():
-                                    future.set_result(data)
-                                del self.pending_requests[request_id]
-                            else:
-                                # Fallback: put it in the queue as before
-                                await self.agent_response_queues[agent_id].put(data)
-                    except json.JSONDecodeError:
-                        # If it's not JSON, put it in the queue as a response
-                        await self.agent_response_queues[agent_id].put(data)
+                await reader
             except WebSocketDisconnect:
                 logger.info(f"Agent {agent_id} disconnected")
-                if agent_id in self.agent_connections:
+                # A reconnect may already have replaced these entries with
+                # the new socket's; only tear down state that still belongs
+                # to this connection
+                if self.agent_connections.get(agent_id) is websocket:
                     del self.agent_connections[agent_id]
-                if agent_id in self.agent_response_queues:
-                    del self.agent_response_queues[agent_id]
-                if agent_id in self.agents:
-                    self.agents[agent_id].status = "disconnected"
+                    if agent_id in self.agent_response_buffers:
+                        del self.agent_response_buffers[agent_id]
+                    if agent_id in self.agents:
+                        self._set_agent_status(self.agents[agent_id], "disconnected")
+                    self._invalidate_views()
+                    self.update_metrics()
         
         @self.app.get("/api/agents")
-        async def get_agents():
-            return {"agents": [agent.model_dump() for agent in self.agents.values()]}
-        
+        async def get_agents(request: Request):
+            if self._agents_json is None:
+                # Timestamps are kept as floats internally; render ISO-8601
+                # only here, at the serialization boundary
+                self._agents_json = orjson.dumps({"agents": [
+                    {**asdict(agent),
+                     "last_seen": datetime.utcfromtimestamp(agent.last_seen).isoformat()}
+                    for agent in self.agents.values()
+                ]})
+            return self._view_response(request, self._agents_json)
+
         @self.app.get("/api/pool/status")
-        async def get_pool_status():
-            return {
-                "total_ips": len(self.ip_pool),
-                "active_agents": len([a for a in self.agents.values() if a.status == "active"]),
-                "ip_pool": [ip.model_dump() for ip in self.ip_pool]
-            }
+        async def get_pool_status(request: Request):
+            if self._pool_json is None:
+                self._pool_json = orjson.dumps({
+                    "total_ips": len(self.ip_pool),
+                    "active_agents": self._active_agents,
+                    "ip_pool": [
+                        {**asdict(ip),
+                         "last_used": datetime.utcfromtimestamp(ip.last_used).isoformat()
+                         if ip.last_used is not None else None}
+                        for ip in self.ip_pool.values()
+                    ]
+                })
+            return self._view_response(request, self._pool_json)
         
         @self.app.post("/api/config/request")
         async def configure_request(config: HTTPRequestConfig):
+            # Dashboards tend to re-POST the same config on every save;
+            # don't re-broadcast to every agent unless it actually changed
+            frame = orjson.dumps({
+                "command": "configure_request",
+                "config": config.model_dump()
+            })
+            if frame == self._config_bytes:
+                return {"status": "success", "message": "Request configuration unchanged"}
             self.request_config = config
+            self._config_bytes = frame
             await self.broadcast_config_to_agents()
             return {"status": "success", "message": "Request configuration updated and propagated"}
         
@@ -144,31 +315,55 @@ class Coordinator:
             return result
         
         @self.app.get("/api/history")
-        async def get_request_history(limit: int = 100):
-            history = list(self.request_history)[-limit:]
-            return {"history": history}
+        async def get_request_history(request: Request, limit: int = 100):
+            # History shares the view version (appends invalidate views),
+            # but the etag must also distinguish requested limits
+            etag = f'W/"{self._view_version}-{limit}"'
+            if request.headers.get("if-none-match") == etag:
+                return Response(status_code=304)
+            # Entries are already serialized JSON; splice the bytes together
+            # instead of parsing and re-serializing each one. islice over
+            # the reversed deque grabs just the suffix without copying all
+            # 1000 entries first
+            entries = list(islice(reversed(self.request_history), max(limit, 0)))[::-1]
+            body = b'{"history":[' + b",".join(entries) + b']}'
+            return Response(content=body, media_type="application/json",
+                            headers={"ETag": etag})
         
         @self.app.delete("/api/agents/{agent_id}")
         async def remove_agent(agent_id: str):
             if agent_id in self.agents:
+                if self.agents[agent_id].status == "active":
+                    self._active_agents -= 1
                 del self.agents[agent_id]
                 if agent_id in self.agent_connections:
                     await self.agent_connections[agent_id].close()
                     del self.agent_connections[agent_id]
-                
-                self.ip_pool = [ip for ip in self.ip_pool if ip.agent_id != agent_id]
+                # The connection entry is gone before the reader observes
+                # the close, so its identity-guarded cleanup won't fire;
+                # drop the buffer here or it leaks
+                self.agent_response_buffers.pop(agent_id, None)
+
+                for old_ip in self.ips_by_agent.pop(agent_id, set()):
+                    self.ip_pool.pop((agent_id, old_ip), None)
+                self._rebuild_available_ips()
+                self._invalidate_views()
+                self.update_metrics()
                 return {"status": "success", "message": f"Agent {agent_id} removed"}
             else:
                 raise HTTPException(status_code=404, detail="Agent not found")
         
         @self.app.get("/api/stats")
-        async def get_stats():
-            total_requests = sum(ip.requests_count for ip in self.ip_pool)
-            return {
+        async def get_stats(request: Request):
+            # Counters are maintained incrementally; only the per-agent
+            # breakdown is rebuilt here, and only after a mutation
+            if self._stats_json is not None:
+                return self._view_response(request, self._stats_json)
+            stats = {
                 "total_agents": len(self.agents),
-                "active_agents": len([a for a in self.agents.values() if a.status == "active"]),
+                "active_agents": self._active_agents,
                 "total_ips": len(self.ip_pool),
-                "total_requests_processed": total_requests,
+                "total_requests_processed": self._total_requests,
                 "agents": {
                     agent_id: {
                         "hostname": agent.hostname,
@@ -179,54 +374,198 @@ class Coordinator:
                     for agent_id, agent in self.agents.items()
                 }
             }
-        
+            self._stats_json = orjson.dumps(stats)
+            return self._view_response(request, self._stats_json)
+
         @self.app.get("/metrics")
         async def get_metrics():
-            # Update metrics before returning
-            self.update_metrics()
-            return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+            # Gauges are refreshed at mutation sites; only uptime needs
+            # stamping here. Text-format serialization is synchronous, so
+            # hand it to the threadpool instead of blocking the event loop.
+            uptime = (datetime.utcnow() - self.start_time).total_seconds()
+            self.metrics['uptime_seconds'].set(uptime)
+            body = await asyncio.to_thread(generate_latest)
+            return Response(body, media_type=CONTENT_TYPE_LATEST)
     
+    async def _drain_agent(self, agent_id: str, websocket: WebSocket):
+        """Reader loop for one agent connection: classify each frame and
+        route it to the heartbeat handler, a pending-request future, or
+        the fallback response queue."""
+        while True:
+            # Accept binary frames without the UTF-8 decode receive_text
+            # forces; orjson parses bytes directly. Text frames from older
+            # agents still work
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code") or 1000)
+            data = message.get("bytes")
+            if data is None:
+                data = message.get("text", "")
+
+            # Cheap sniff before the full parse: single-object frames from
+            # our agents serialize with a stable field order, so a prefix
+            # check spots heartbeats and a small regex pulls the request_id
+            # out of responses. The future consumer does the real parse;
+            # batched array frames fall through to the generic path.
+            raw = data if isinstance(data, bytes) else data.encode()
+            if raw.startswith(b'{'):
+                if raw.startswith(b'{"type":"heartbeat"'):
+                    await self.handle_agent_message(agent_id, orjson.loads(raw))
+                    continue
+                rid_match = _RID_RE.search(raw)
+                if rid_match:
+                    future = self.pending_requests.pop(rid_match.group(1).decode(), None)
+                    if future is not None:
+                        if not future.done():
+                            future.set_result(raw)
+                        continue
+
+            try:
+                msg = orjson.loads(data)
+            except orjson.JSONDecodeError:
+                # If it's not JSON, buffer it as a response
+                self._buffer_response(agent_id, data)
+                continue
+
+            # Agents may coalesce several messages into one array frame
+            batched = isinstance(msg, list)
+            for item in (msg if batched else [msg]):
+                if item.get("type") == "heartbeat":
+                    # Already parsed; hand the dict straight down
+                    await self.handle_agent_message(agent_id, item)
+                else:
+                    # Responses travel as serialized payloads; only
+                    # re-dump when the frame was a batch
+                    payload = orjson.dumps(item) if batched else data
+                    # Check if this is a response to a pending request
+                    request_id = item.get("request_id")
+                    if request_id and request_id in self.pending_requests:
+                        # This is a response to a specific request
+                        future = self.pending_requests[request_id]
+                        if not future.done():
+                            future.set_result(payload)
+                        del self.pending_requests[request_id]
+                    else:
+                        # Fallback: buffer it as before
+                        self._buffer_response(agent_id, payload)
+
+    def _invalidate_views(self):
+        # Any registry or pool mutation makes the cached endpoint bodies stale
+        self._agents_json = None
+        self._pool_json = None
+        self._stats_json = None
+        self._view_version += 1
+
+    def _view_response(self, request: Request, body: bytes) -> Response:
+        # Weak version-counter ETag: pollers with a current copy get an
+        # empty 304 instead of the full body
+        etag = f'W/"{self._view_version}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304)
+        return Response(content=body, media_type="application/json",
+                        headers={"ETag": etag})
+
+    def _set_agent_status(self, agent: AgentInfo, status: str):
+        # Keep the active-agent counter in step with status transitions
+        if agent.status != status:
+            if status == "active":
+                self._active_agents += 1
+            elif agent.status == "active":
+                self._active_agents -= 1
+            agent.status = status
+
+    def _bound_metric(self, name: str, *labels):
+        # Only used for label sets with bounded cardinality (agent ids,
+        # status classes, methods) — never for free-form error strings
+        key = (name, *labels)
+        child = self._bound_metrics.get(key)
+        if child is None:
+            child = self._bound_metrics[key] = self.metrics[name].labels(*labels)
+        return child
+
+    def _buffer_response(self, agent_id: str, payload):
+        entry = self.agent_response_buffers.get(agent_id)
+        if entry is None:
+            return
+        buf, fut = entry
+        buf.append(payload)
+        if not fut.done():
+            fut.set_result(None)
+
     def update_ip_pool(self, agent_id: str, ipv6_addresses: List[str]):
-        self.ip_pool = [ip for ip in self.ip_pool if ip.agent_id != agent_id]
-        
+        # Periodic heartbeats usually repeat the same address set; skip the
+        # pool rewrite and the O(pool) available-deque rebuild in that case.
+        # The round-robin loop may have marked these IPs unavailable while
+        # the agent was disconnected, and heartbeats are how the pool heals,
+        # so restore any flipped entries before returning.
+        if self.ips_by_agent.get(agent_id) == set(ipv6_addresses):
+            entries = [self.ip_pool.get((agent_id, ip))
+                       for ip in self.ips_by_agent[agent_id]]
+            # ips_by_agent claiming an IP the pool no longer holds means
+            # the bookkeeping diverged; fall through to the full rebuild
+            # rather than healing over the inconsistency
+            if all(entry is not None for entry in entries):
+                stale = [entry for entry in entries if entry.status != "available"]
+                if stale:
+                    for entry in stale:
+                        entry.status = "available"
+                    self._rebuild_available_ips()
+                    self._invalidate_views()
+                    self.update_metrics()
+                return
+
+        # Drop the agent's previous IPs, then insert the current set
+        for old_ip in self.ips_by_agent.pop(agent_id, set()):
+            self.ip_pool.pop((agent_id, old_ip), None)
+
+        agent_ips = set()
         for ip in ipv6_addresses:
-            ip_status = IPStatus(
+            self.ip_pool[(agent_id, ip)] = IPStatus(
                 ip=ip,
                 agent_id=agent_id,
                 status="available"
             )
-            self.ip_pool.append(ip_status)
+            agent_ips.add(ip)
+        self.ips_by_agent[agent_id] = agent_ips
+        self._rebuild_available_ips()
+        self._invalidate_views()
+        self.update_metrics()
+
+    def _rebuild_available_ips(self):
+        # Membership changes are rare (registration, removal, status flips);
+        # rebuilding here keeps per-request selection allocation-free
+        self.available_ips = deque(
+            ip for ip in self.ip_pool.values() if ip.status == "available"
+        )
     
     def update_metrics(self):
-        # Update gauge metrics
-        active_agents = len([a for a in self.agents.values() if a.status == "active"])
-        available_ips = len([ip for ip in self.ip_pool if ip.status == "available"])
-        
+        # Called from mutation sites (register, disconnect, pool updates),
+        # not per scrape; counts come from maintained structures
         self.metrics['agents_connected'].set(len(self.agent_connections))
         self.metrics['agents_total'].set(len(self.agents))
         self.metrics['ip_pool_size'].set(len(self.ip_pool))
-        self.metrics['ip_pool_available'].set(available_ips)
+        self.metrics['ip_pool_available'].set(len(self.available_ips))
         self.metrics['websocket_connections'].set(len(self.agent_connections))
-        
-        # Update uptime
-        uptime = (datetime.utcnow() - self.start_time).total_seconds()
-        self.metrics['uptime_seconds'].set(uptime)
-        
-        # Update queue depths
-        for agent_id, queue in self.agent_response_queues.items():
-            self.metrics['queue_depth'].labels(agent_id=agent_id).set(queue.qsize())
     
-    async def handle_agent_message(self, agent_id: str, message: str):
+    async def handle_agent_message(self, agent_id: str, data: dict):
         try:
-            data = json.loads(message)
             msg_type = data.get("type")
-            
+
             if msg_type == "heartbeat":
                 heartbeat_data = data.get("data", {})
                 if agent_id in self.agents:
-                    self.agents[agent_id].last_seen = datetime.utcnow()
-                    self.agents[agent_id].status = "active"
+                    agent = self.agents[agent_id]
+                    agent.last_seen = time.time()
+                    if agent.status != "active":
+                        # Going inactive consumed the agent's heap entry;
+                        # re-enter expiry tracking on the way back
+                        self._set_agent_status(agent, "active")
+                        self._schedule_expiry(agent_id, agent.last_seen)
                     self.update_ip_pool(agent_id, heartbeat_data.get("ipv6_addresses", []))
+                    # Bump the view version for last_seen (and any status
+                    # flip) as well; heartbeats arrive on address change or
+                    # every 5 minutes, so the cache churn is negligible
+                    self._invalidate_views()
             
         except Exception as e:
             logger.error(f"Error handling agent message: {e}")
@@ -234,97 +573,128 @@ class Coordinator:
     async def broadcast_config_to_agents(self):
         if not self.request_config:
             return
-        
-        message = json.dumps({
-            "command": "configure_request",
-            "config": self.request_config.model_dump()
-        })
-        
+
+        # Frame is pre-serialized when the config is set; every broadcast
+        # reuses the same bytes instead of re-dumping per call
+        if self._config_bytes is None:
+            self._config_bytes = orjson.dumps({
+                "command": "configure_request",
+                "config": self.request_config.model_dump()
+            })
+        message = self._config_bytes
+
+        # Fan out concurrently; one slow agent no longer serializes the rest
+        agent_ids = list(self.agent_connections.keys())
+        results = await asyncio.gather(
+            *(self.agent_connections[agent_id].send_bytes(message) for agent_id in agent_ids),
+            return_exceptions=True
+        )
+
         disconnected = []
-        for agent_id, ws in self.agent_connections.items():
-            try:
-                await ws.send_text(message)
-            except Exception as e:
-                logger.error(f"Failed to send config to agent {agent_id}: {e}")
+        for agent_id, result in zip(agent_ids, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to send config to agent {agent_id}: {result}")
                 disconnected.append(agent_id)
-        
+
         for agent_id in disconnected:
             del self.agent_connections[agent_id]
             if agent_id in self.agents:
-                self.agents[agent_id].status = "disconnected"
+                self._set_agent_status(self.agents[agent_id], "disconnected")
+        if disconnected:
+            self._invalidate_views()
+            self.update_metrics()
     
     async def execute_with_round_robin(self, execute_config: ExecuteRequest) -> Dict:
-        available_ips = [ip for ip in self.ip_pool if ip.status == "available"]
-        
-        if not available_ips:
+        if not self.available_ips:
             raise HTTPException(status_code=503, detail="No available IPs in pool")
-        
-        self.round_robin_index = self.round_robin_index % len(available_ips)
-        selected_ip = available_ips[self.round_robin_index]
-        self.round_robin_index += 1
-        
+
+        # Advance past dead candidates instead of failing on the first one;
+        # skipping without dropping would skew traffic onto the next
+        # healthy host and surface needless 503s to the caller
+        selected_ip = None
+        for _ in range(len(self.available_ips)):
+            candidate = self.available_ips[0]
+            if candidate.status == "available" and candidate.agent_id in self.agent_connections:
+                self.available_ips.rotate(-1)
+                selected_ip = candidate
+                break
+            candidate.status = "unavailable"
+            self.available_ips.popleft()
+
+        if selected_ip is None:
+            raise HTTPException(status_code=503, detail="No connected agents with available IPs")
+
         agent_id = selected_ip.agent_id
         
-        if agent_id not in self.agent_connections:
-            selected_ip.status = "unavailable"
-            raise HTTPException(status_code=503, detail=f"Agent {agent_id} is not connected")
-        
-        if not hasattr(self, 'agent_response_queues') or agent_id not in self.agent_response_queues:
-            raise HTTPException(status_code=503, detail=f"Agent {agent_id} response queue not initialized")
+        # agent_response_buffers is always created in __init__; a missing
+        # entry just means this agent has no live WebSocket connection
+        if self.agent_response_buffers.get(agent_id) is None:
+            raise HTTPException(status_code=503, detail=f"Agent {agent_id} response buffer not initialized")
         
         # Generate unique request ID to match request with response
-        request_id = str(uuid.uuid4())
-        
-        message = json.dumps({
-            "command": "execute_request",
-            "request_id": request_id,
-            "source_ip": selected_ip.ip,
-            "config": execute_config.model_dump()
-        })
+        self._next_req_id += 1
+        request_id = f"{self._req_id_prefix}-{self._next_req_id}"
         
+        # __dict__ holds exactly the validated fields in pydantic v2 and
+        # skips model_dump's recursive tree walk; orjson serializes the
+        # HTTPMethod str-enum by value. The config fragment is memoized
+        # (pydantic equality is field-wise) and the envelope is spliced
+        # from bytes — request_id and IPv6 literals never need escaping
+        if execute_config != self._last_exec_config:
+            self._last_exec_config = execute_config
+            self._last_exec_config_frag = orjson.dumps(execute_config.__dict__)
+        message = (b'{"command":"execute_request","request_id":"' + request_id.encode()
+                   + b'","source_ip":"' + selected_ip.ip.encode()
+                   + b'","config":' + self._last_exec_config_frag + b'}')
+
         try:
             ws = self.agent_connections[agent_id]
-            
-            # Create a future for this specific request
-            future = asyncio.Future()
+
+            # Create a future for this specific request; create_future on
+            # the running loop skips the deprecated get_event_loop lookup
+            # inside Future.__init__ (futures are single-shot, so there is
+            # no pool to reuse them from)
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
             self.pending_requests[request_id] = future
+
+            await ws.send_bytes(message)
             
-            await ws.send_text(message)
-            
-            # Wait for the specific response using the future
-            start_time = datetime.utcnow()
+            # Wait for the specific response using the future; monotonic
+            # loop.time() avoids two datetime allocations per request and
+            # is immune to wall-clock jumps
+            start_time = loop.time()
             try:
                 response_text = await asyncio.wait_for(future, timeout=35.0)
-                response = json.loads(response_text)
+                response = orjson.loads(response_text)
             except asyncio.TimeoutError:
                 # Clean up the pending request on timeout
                 if request_id in self.pending_requests:
                     del self.pending_requests[request_id]
                 # Track timeout error
-                self.metrics['request_errors'].labels(agent_id=agent_id, error_type='timeout').inc()
+                self._bound_metric('request_errors', agent_id, 'timeout').inc()
                 raise
             
             # Track request metrics
-            duration = (datetime.utcnow() - start_time).total_seconds()
-            status_code = response.get("status_code", "unknown")
+            duration = loop.time() - start_time
+            status_code = response.get("status_code")
+            status_class = f"{status_code // 100}xx" if isinstance(status_code, int) else "unknown"
             method = execute_config.method
-            
-            self.metrics['requests_total'].labels(
-                agent_id=agent_id, 
-                status_code=str(status_code), 
-                method=method
-            ).inc()
-            self.metrics['requests_duration'].labels(
-                agent_id=agent_id, 
-                method=method
-            ).observe(duration)
-            self.metrics['agent_requests'].labels(agent_id=agent_id).inc()
-            
+
+            key = (agent_id, status_class, method)
+            self._req_counts[key] = self._req_counts.get(key, 0) + 1
+            hist = self._dur_hist.get(method)
+            if hist is None:
+                hist = self._dur_hist[method] = [0] * (len(_DURATION_BUCKETS) + 1) + [0.0]
+            hist[bisect_left(_DURATION_BUCKETS, duration)] += 1
+            hist[-1] += duration
+
             # Track response size
             response_body = response.get("body", "")
             if response_body:
                 response_size = len(str(response_body).encode('utf-8'))
-                self.metrics['response_size_bytes'].labels(agent_id=agent_id).observe(response_size)
+                self._size_hist[bisect_left(_SIZE_BUCKETS, response_size)] += 1
+                self._size_hist[-1] += response_size
             
             # Track errors if request failed
             if not response.get("success", False):
@@ -337,18 +707,31 @@ class Coordinator:
             actual_source_ip = response.get("metadata", {}).get("source_ip", selected_ip.ip)
             
             # Update the IP status with the actual IP used
-            for ip in self.ip_pool:
-                if ip.ip == actual_source_ip and ip.agent_id == agent_id:
-                    ip.last_used = datetime.utcnow()
-                    ip.requests_count += 1
-                    break
+            used_ip = self.ip_pool.get((agent_id, actual_source_ip))
+            if used_ip:
+                used_ip.last_used = time.time()
+                used_ip.requests_count += 1
+                self._total_requests += 1
             
             if agent_id in self.agents:
                 self.agents[agent_id].requests_processed += 1
+            self._invalidate_views()
             
             # Return the agent's response directly without wrapping it
-            # The agent already includes all necessary metadata
-            self.request_history.append(response)
+            # The agent already includes all necessary metadata.
+            # History keeps a compact pre-serialized record per request —
+            # retaining full response bodies for 1000 entries pins
+            # arbitrary amounts of memory and bloats /api/history
+            self.request_history.append(orjson.dumps({
+                "timestamp": datetime.utcfromtimestamp(time.time()).isoformat(),
+                "agent_id": agent_id,
+                "source_ip": actual_source_ip,
+                "method": method,
+                "url": execute_config.url,
+                "status_code": status_code,
+                "duration": round(duration, 4),
+                "success": response.get("success", False)
+            }))
             return response
             
         except asyncio.TimeoutError:
@@ -357,14 +740,41 @@ class Coordinator:
             logger.error(f"Error executing request: {e}")
             raise HTTPException(status_code=500, detail=str(e))
     
+    def _schedule_expiry(self, agent_id: str, last_seen: float):
+        heapq.heappush(self._expiry_heap, (last_seen + 120.0, agent_id))
+
     async def cleanup_inactive_agents(self):
+        # Sleep until the earliest scheduled expiry rather than waking up
+        # every minute to scan the whole registry. Heartbeats don't remove
+        # heap entries; a popped entry is re-verified against the agent's
+        # current last_seen and rescheduled if it moved forward.
         while True:
-            await asyncio.sleep(60)
-            now = datetime.utcnow()
-            for agent_id, agent in list(self.agents.items()):
-                if agent.status == "active" and (now - agent.last_seen) > timedelta(minutes=2):
-                    agent.status = "inactive"
-                    logger.warning(f"Agent {agent_id} marked as inactive")
+            if not self._expiry_heap:
+                await asyncio.sleep(60)
+                continue
+            now = time.time()
+            deadline, agent_id = self._expiry_heap[0]
+            if deadline > now:
+                await asyncio.sleep(deadline - now)
+                continue
+            heapq.heappop(self._expiry_heap)
+            agent = self.agents.get(agent_id)
+            if agent is None or agent.status != "active":
+                continue
+            true_deadline = agent.last_seen + 120.0
+            if true_deadline > now:
+                heapq.heappush(self._expiry_heap, (true_deadline, agent_id))
+                continue
+            # Agents only send heartbeat frames on address change or every
+            # 5 minutes; an open WebSocket (kept alive by ping/pong) still
+            # counts as presence
+            if agent_id in self.agent_connections:
+                agent.last_seen = now
+                self._schedule_expiry(agent_id, now)
+                continue
+            self._set_agent_status(agent, "inactive")
+            self._invalidate_views()
+            logger.warning(f"Agent {agent_id} marked as inactive")
     
     def get_app(self):
         return self.app
@@ -377,7 +787,7 @@ class Coordinator:
         logger.info(f"Starting coordinator on {len(bind_addresses)} bind addresses: {bind_addresses}")
         
         # Create cleanup task
-        cleanup_task = asyncio.create_task(self.cleanup_inactive_agents())
+        self._cleanup_task = asyncio.create_task(self.cleanup_inactive_agents())
         
         # Create server tasks for each bind address
         server_tasks = []
@@ -388,6 +798,15 @@ class Coordinator:
                 app=self.get_app(),
                 host=host,
                 port=port,
+                loop="uvloop",  # libuv event loop (C) instead of default asyncio
+                http="httptools",  # C HTTP parser instead of pure-Python h11
+                ws="websockets",
+                # Compressing small JSON frames costs more than it saves;
+                # agents already connect with compression disabled
+                ws_per_message_deflate=False,
+                lifespan="off",  # No startup/shutdown handlers; skip the protocol round-trip
+                access_log=False,
+                log_config=None,  # Skip uvicorn's dictConfig; root logging is already set up
                 log_level="warning"  # Reduce uvicorn noise
             )
             server = uvicorn.Server(config)
@@ -403,7 +822,7 @@ class Coordinator:
             logger.error(f"Error in server tasks: {e}")
         finally:
             # Cleanup
-            cleanup_task.cancel()
+            self._cleanup_task.cancel()
             for server in servers:
                 if hasattr(server, 'should_exit'):
                     server.should_exit = True
\ No newline at end of file
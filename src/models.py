@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
+from dataclasses import dataclass
 from typing import List, Dict, Optional, Any
-from datetime import datetime
 from enum import Enum
 
 
@@ -21,19 +21,26 @@ class HTTPRequestConfig(BaseModel):
     timeout: float = 30.0
 
 
-class AgentInfo(BaseModel):
+# AgentInfo and IPStatus are coordinator-internal state, never parsed from
+# the wire, so they are slotted dataclasses rather than pydantic models:
+# fixed-offset attribute access and roughly a third of the per-object memory,
+# which matters for pools of thousands of IPs.
+
+@dataclass(slots=True)
+class AgentInfo:
     agent_id: str
     hostname: str
     ipv6_addresses: List[str]
-    last_seen: datetime
+    last_seen: float  # time.time(); rendered as ISO-8601 only at the API
     status: str = "active"
     requests_processed: int = 0
 
 
-class IPStatus(BaseModel):
+@dataclass(slots=True)
+class IPStatus:
     ip: str
     agent_id: str
-    last_used: Optional[datetime] = None
+    last_used: Optional[float] = None  # time.time(), see AgentInfo.last_seen
     requests_count: int = 0
     status: str = "available"
 
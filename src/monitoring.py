@@ -3,10 +3,11 @@ from textual.containers import Container, Horizontal, Vertical, ScrollableContai
 from textual.widgets import Header, Footer, Static, DataTable, Button, Input, Label, TabbedContent, TabPane
 from textual.reactive import reactive
 from textual import work
+import atexit
 import httpx
 import asyncio
+import orjson
 from datetime import datetime
-import json
 from typing import Optional, Dict, List, Any
 import logging
 
@@ -15,6 +16,33 @@ logging.getLogger("httpx").setLevel(logging.CRITICAL)
 logging.getLogger("httpcore").setLevel(logging.CRITICAL)
 logging.getLogger("asyncio").setLevel(logging.CRITICAL)
 
+# Shared per-coordinator clients so multiple app instances (or reruns in
+# the same process) don't fragment the connection pool
+_shared_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def get_client(base_url: str) -> httpx.AsyncClient:
+    client = _shared_clients.get(base_url)
+    if client is None or client.is_closed:
+        client = _shared_clients[base_url] = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=8, max_connections=16)
+        )
+    return client
+
+
+def _close_shared_clients():
+    for client in _shared_clients.values():
+        if not client.is_closed:
+            try:
+                asyncio.run(client.aclose())
+            except Exception:
+                pass
+
+
+atexit.register(_close_shared_clients)
+
 
 class MonitoringApp(App):
     CSS = """
@@ -72,13 +100,37 @@ class MonitoringApp(App):
         self.stats: Dict = {}
         self.history_data: List[Dict] = []
         self.last_result: Optional[Dict] = None
-        self.refresh_task = None
+        # One pooled client for the app's lifetime; per-call clients pay a
+        # fresh TCP handshake on every poll
+        self.http: Optional[httpx.AsyncClient] = None
+        # Conditional-GET state per path; the coordinator answers 304 when
+        # nothing changed and we reuse the cached parse
+        self._etags: Dict[str, str] = {}
+        self._cached: Dict[str, Any] = {}
+        # Adaptive poll cadence: back off while the data is static, snap
+        # back to the floor on change or user action
+        self._poll_interval = 2.0
+        self._max_interval = 30.0
+        self._poll_timer = None
+        # Headers/body are parsed once when the input changes, not on
+        # every save/execute click
+        self._parsed_headers: Dict = {}
+        self._parsed_body: Any = None
+        # Drops refreshes that land while one is already in flight
+        self._refreshing = False
+        # Deferred repaint for the overview widgets while another tab is up
+        self._overview_dirty = False
+        # Pretty-printed last result, rebuilt only when the payload changes
+        self._last_result_hash: Optional[int] = None
+        self._last_result_pretty = ""
     
     def compose(self) -> ComposeResult:
         yield Header()
         yield Footer()
         
-        with TabbedContent():
+        # Keep a direct reference so keybindings don't re-query the DOM
+        self._tabs = TabbedContent()
+        with self._tabs:
             with TabPane("Overview", id="overview"):
                 with Horizontal():
                     with Vertical():
@@ -132,86 +184,200 @@ class MonitoringApp(App):
             
     
     async def on_mount(self) -> None:
-        self.refresh_task = self.set_interval(5, self.action_refresh)
+        # Shared module-level client: not closed on unmount so a relaunch
+        # in the same process reuses the warm pool; atexit cleans up
+        self.http = get_client(self.coordinator_url)
         self.action_refresh()
     
+    async def _get_json(self, path: str):
+        """Conditional GET: returns (parsed-or-cached data, changed flag)."""
+        headers = {}
+        etag = self._etags.get(path)
+        if etag:
+            headers["If-None-Match"] = etag
+        response = await self.http.get(path, headers=headers)
+        if response.status_code == 304:
+            return self._cached.get(path), False
+        data = orjson.loads(response.content)
+        etag = response.headers.get("etag")
+        if etag:
+            self._etags[path] = etag
+        self._cached[path] = data
+        return data, True
+
     async def refresh_data(self) -> None:
+        # A manual refresh landing between timer ticks would otherwise race
+        # a second fetch and repaint the same state twice
+        if self._refreshing:
+            return
+        self._refreshing = True
         try:
-            async with httpx.AsyncClient() as client:
-                agents_response = await client.get(f"{self.coordinator_url}/api/agents")
-                self.agents_data = agents_response.json().get("agents", [])
-                
-                pool_response = await client.get(f"{self.coordinator_url}/api/pool/status")
-                self.pool_status = pool_response.json()
-                
-                stats_response = await client.get(f"{self.coordinator_url}/api/stats")
-                self.stats = stats_response.json()
-                
-                history_response = await client.get(f"{self.coordinator_url}/api/history?limit=50")
-                self.history_data = history_response.json().get("history", [])
-            
-            self.update_display()
+            # The four endpoints are independent; fetch them concurrently so
+            # a refresh costs one round trip, not four. A single failing
+            # endpoint keeps the previous data instead of blanking the rest.
+            agents, pool, stats, history = await asyncio.gather(
+                self._get_json("/api/agents"),
+                self._get_json("/api/pool/status"),
+                self._get_json("/api/stats"),
+                self._get_json("/api/history?limit=50"),
+                return_exceptions=True
+            )
+
+            changed = False
+            if not isinstance(agents, Exception) and agents[0] is not None:
+                self.agents_data = agents[0].get("agents", [])
+                changed |= agents[1]
+            if not isinstance(pool, Exception) and pool[0] is not None:
+                self.pool_status = pool[0]
+                changed |= pool[1]
+            if not isinstance(stats, Exception) and stats[0] is not None:
+                self.stats = stats[0]
+                changed |= stats[1]
+            if not isinstance(history, Exception) and history[0] is not None:
+                self.history_data = history[0].get("history", [])
+                changed |= history[1]
+                # Stamp a comparable epoch key once at ingest so repaints
+                # sort without re-parsing ISO strings every tick
+                for item in self.history_data:
+                    if "_ts" not in item:
+                        item["_ts"] = self._epoch(item.get("timestamp"))
+
+            # All four came back 304: the screen already shows this state
+            if changed:
+                # The display widgets all live on the overview tab; defer
+                # the repaint while another tab is active
+                if self._tabs.active == "overview":
+                    self.update_display()
+                else:
+                    self._overview_dirty = True
+                self._poll_interval = 2.0
+            else:
+                self._poll_interval = min(self._poll_interval * 1.5, self._max_interval)
         except Exception as e:
             self.status_widget.update(f"Error: {e}")
+        finally:
+            self._refreshing = False
+            self._schedule_next_poll()
+
+    def _pretty_result(self, result: Dict) -> str:
+        # Re-pretty-printing a large identical payload on every repaint (or
+        # repeated execute clicks) is wasted serialize+render work; hash the
+        # compact form and cap the output so the Static stays bounded
+        h = hash(orjson.dumps(result))
+        if h != self._last_result_hash:
+            self._last_result_hash = h
+            pretty = orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()
+            self._last_result_pretty = "\n".join(pretty.splitlines()[:200])
+        return self._last_result_pretty
+
+    @staticmethod
+    def _epoch(timestamp: Optional[str]) -> float:
+        if not timestamp:
+            return 0.0
+        try:
+            return datetime.fromisoformat(timestamp).timestamp()
+        except ValueError:
+            return 0.0
+
+    def _schedule_next_poll(self) -> None:
+        if self._poll_timer is not None:
+            self._poll_timer.stop()
+        self._poll_timer = self.set_timer(self._poll_interval, self._poll)
+
+    def _poll(self) -> None:
+        # Timer-driven refresh: keep the backed-off cadence
+        self.run_worker(self.refresh_data())
     
     def update_display(self):
-        status_text = f"Active Agents: {self.pool_status.get('active_agents', 0)}\n"
-        status_text += f"Total IPs: {self.pool_status.get('total_ips', 0)}\n"
-        self.status_widget.update(status_text)
-        
+        # Collect fragments and join once; chained += on str reallocates
+        # the whole buffer per append
+        self.status_widget.update(
+            f"Active Agents: {self.pool_status.get('active_agents', 0)}\n"
+            f"Total IPs: {self.pool_status.get('total_ips', 0)}\n"
+        )
+
         # Create detailed stats with agent and IP info
-        stats_text = f"=== SYSTEM STATS ===\n"
-        stats_text += f"Total Agents: {self.stats.get('total_agents', 0)}\n"
-        stats_text += f"Active Agents: {self.stats.get('active_agents', 0)}\n"
-        stats_text += f"Total Requests: {self.stats.get('total_requests_processed', 0)}\n"
-        stats_text += f"Total IPs in Pool: {len(self.pool_status.get('ip_pool', []))}\n\n"
-        
+        parts = [
+            f"=== SYSTEM STATS ===\n"
+            f"Total Agents: {self.stats.get('total_agents', 0)}\n"
+            f"Active Agents: {self.stats.get('active_agents', 0)}\n"
+            f"Total Requests: {self.stats.get('total_requests_processed', 0)}\n"
+            f"Total IPs in Pool: {len(self.pool_status.get('ip_pool', []))}\n\n"
+        ]
+
         # Add agent details
         if self.agents_data:
-            stats_text += "=== CONNECTED AGENTS ===\n"
+            parts.append("=== CONNECTED AGENTS ===\n")
             for agent in self.agents_data:
-                stats_text += f"\n• {agent.get('agent_id', 'N/A')}\n"
-                stats_text += f"  Host: {agent.get('hostname', 'N/A')}\n"
-                stats_text += f"  IPv6s: {len(agent.get('ipv6_addresses', []))}\n"
-                stats_text += f"  Status: {agent.get('status', 'N/A')}\n"
-                stats_text += f"  Requests: {agent.get('requests_processed', 0)}\n"
-        
+                parts.append(
+                    f"\n• {agent.get('agent_id', 'N/A')}\n"
+                    f"  Host: {agent.get('hostname', 'N/A')}\n"
+                    f"  IPv6s: {len(agent.get('ipv6_addresses', []))}\n"
+                    f"  Status: {agent.get('status', 'N/A')}\n"
+                    f"  Requests: {agent.get('requests_processed', 0)}\n"
+                )
+
         # Add IP pool summary
         ip_pool = self.pool_status.get("ip_pool", [])
         if ip_pool:
-            stats_text += f"\n=== IP POOL ({len(ip_pool)} IPs) ===\n"
+            parts.append(f"\n=== IP POOL ({len(ip_pool)} IPs) ===\n")
             for ip in ip_pool[:5]:  # Show first 5 IPs
-                stats_text += f"• {ip.get('ip', 'N/A')} ({ip.get('agent_id', 'N/A')})\n"
+                parts.append(f"• {ip.get('ip', 'N/A')} ({ip.get('agent_id', 'N/A')})\n")
             if len(ip_pool) > 5:
-                stats_text += f"... and {len(ip_pool) - 5} more\n"
-        
-        self.stats_widget.update(stats_text)
-        
+                parts.append(f"... and {len(ip_pool) - 5} more\n")
+
+        self.stats_widget.update("".join(parts))
+
         # Update result widget with history
         if self.history_data:
-            history_text = "=== RECENT REQUESTS ===\n\n"
-            for item in self.history_data[:10]:  # Show last 10
-                if "result" in item:
-                    metadata = item.get("metadata", {})
-                    result = item.get("result", {})
-                else:
-                    metadata = item.get("metadata", {})
-                    result = item
-                
-                timestamp = metadata.get("timestamp", "")[:19] if metadata.get("timestamp") else ""
-                agent_id = metadata.get("agent_id", "N/A")
-                source_ip = metadata.get("source_ip", "N/A")
-                status = "✓" if result.get("success") else "✗"
-                code = result.get("status_code", "N/A")
-                
-                history_text += f"{timestamp} [{status}] {code} - {agent_id} ({source_ip})\n"
-            
+            lines = ["=== RECENT REQUESTS ===\n\n"]
+            recent = sorted(self.history_data, key=lambda i: i.get("_ts", 0.0), reverse=True)
+            for item in recent[:10]:  # Show last 10
+                # History entries are flat compact records
+                timestamp = (item.get("timestamp") or "")[:19]
+                agent_id = item.get("agent_id", "N/A")
+                source_ip = item.get("source_ip", "N/A")
+                status = "✓" if item.get("success") else "✗"
+                code = item.get("status_code", "N/A")
+
+                lines.append(f"{timestamp} [{status}] {code} - {agent_id} ({source_ip})\n")
+
             if self.last_result:
-                history_text += f"\n=== LAST RESULT DETAILS ===\n"
-                history_text += json.dumps(self.last_result, indent=2)
-            
-            self.result_widget.update(history_text)
+                lines.append("\n=== LAST RESULT DETAILS ===\n")
+                lines.append(self._pretty_result(self.last_result))
+
+            self.result_widget.update("".join(lines))
     
+    def on_tabbed_content_tab_activated(self, event: TabbedContent.TabActivated) -> None:
+        if self._tabs.active == "overview" and self._overview_dirty:
+            self._overview_dirty = False
+            self.update_display()
+
+    async def on_input_changed(self, event: Input.Changed) -> None:
+        # Validate-and-cache as the user types; a red border flags bad
+        # JSON instead of failing later on the click path
+        if event.input is self.headers_input:
+            try:
+                self._parsed_headers = orjson.loads(event.value or "{}")
+                self.headers_input.styles.border = ("solid", "blue")
+            except orjson.JSONDecodeError:
+                self.headers_input.styles.border = ("solid", "red")
+        elif event.input is self.body_input:
+            try:
+                self._parsed_body = orjson.loads(event.value or "null")
+                self.body_input.styles.border = ("solid", "blue")
+            except orjson.JSONDecodeError:
+                self.body_input.styles.border = ("solid", "red")
+
+    def _build_config(self) -> Dict:
+        return {
+            "url": self.url_input.value,
+            "method": self.method_input.value,
+            "headers": self._parsed_headers,
+            "body": self._parsed_body,
+            "timeout": float(self.timeout_input.value or "30")
+        }
+
     async def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "save-config":
             self.save_configuration()
@@ -223,89 +389,88 @@ class MonitoringApp(App):
     @work
     async def save_configuration(self) -> None:
         try:
-            config = {
-                "url": self.url_input.value,
-                "method": self.method_input.value,
-                "headers": json.loads(self.headers_input.value or "{}"),
-                "body": json.loads(self.body_input.value or "null"),
-                "timeout": float(self.timeout_input.value or "30")
-            }
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.coordinator_url}/api/config/request",
-                    json=config
-                )
-                
-                if response.status_code == 200:
-                    self.notify("Configuration saved successfully", severity="information")
-                else:
-                    self.notify(f"Failed to save configuration: {response.text}", severity="error")
+            response = await self.http.post("/api/config/request", json=self._build_config())
+
+            if response.status_code == 200:
+                self.notify("Configuration saved successfully", severity="information")
+            else:
+                self.notify(f"Failed to save configuration: {response.text}", severity="error")
         except Exception as e:
             self.notify(f"Error saving configuration: {e}", severity="error")
     
     @work
     async def load_configuration(self) -> None:
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.coordinator_url}/api/config/request")
-                
-                if response.status_code == 200:
-                    config = response.json()
-                    self.url_input.value = config.get("url", "")
-                    self.method_input.value = config.get("method", "GET")
-                    self.headers_input.value = json.dumps(config.get("headers", {}))
-                    body = config.get("body")
-                    self.body_input.value = json.dumps(body) if body is not None else ""
-                    self.timeout_input.value = str(config.get("timeout", 30))
-                    self.notify("Configuration loaded", severity="information")
-                else:
-                    self.notify("No configuration available", severity="warning")
+            response = await self.http.get("/api/config/request")
+
+            if response.status_code == 200:
+                config = orjson.loads(response.content)
+                self.url_input.value = config.get("url", "")
+                self.method_input.value = config.get("method", "GET")
+                self.headers_input.value = orjson.dumps(config.get("headers", {})).decode()
+                body = config.get("body")
+                self.body_input.value = orjson.dumps(body).decode() if body is not None else ""
+                self.timeout_input.value = str(config.get("timeout", 30))
+                self.notify("Configuration loaded", severity="information")
+            else:
+                self.notify("No configuration available", severity="warning")
         except Exception as e:
             self.notify(f"Error loading configuration: {e}", severity="error")
     
     @work
     async def execute_request(self) -> None:
         try:
-            config = {
-                "url": self.url_input.value,
-                "method": self.method_input.value,
-                "headers": json.loads(self.headers_input.value or "{}"),
-                "body": json.loads(self.body_input.value or "null"),
-                "timeout": float(self.timeout_input.value or "30")
-            }
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.post(f"{self.coordinator_url}/api/execute", json=config)
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    self.last_result = result
-                    
-                    # Handle both old format (nested) and new format (flat)
-                    metadata = result.get('metadata', {})
-                    status_code = result.get('status_code', 'N/A')
-                    
-                    result_text = f"Success!\n"
-                    result_text += f"Agent: {metadata.get('agent_id', 'N/A')}\n"
-                    result_text += f"Source IP: {metadata.get('source_ip', 'N/A')}\n"
-                    result_text += f"Status Code: {status_code}\n"
-                    
-                    self.execute_result.update(result_text)
-                    self.result_widget.update(json.dumps(result, indent=2))
-                    
-                    await self.refresh_data()
-                else:
-                    error_text = f"Failed: {response.text}"
-                    self.execute_result.update(error_text)
+            response = await self.http.post("/api/execute", json=self._build_config())
+
+            if response.status_code == 200:
+                result = orjson.loads(response.content)
+                self.last_result = result
+
+                # Handle both old format (nested) and new format (flat)
+                metadata = result.get('metadata', {})
+                status_code = result.get('status_code', 'N/A')
+
+                result_text = f"Success!\n"
+                result_text += f"Agent: {metadata.get('agent_id', 'N/A')}\n"
+                result_text += f"Source IP: {metadata.get('source_ip', 'N/A')}\n"
+                result_text += f"Status Code: {status_code}\n"
+
+                self.execute_result.update(result_text)
+                self.result_widget.update(self._pretty_result(result))
+
+                # Patch history locally and re-pull just the stats counters;
+                # agents and pool didn't change, so the full four-endpoint
+                # refresh stays on the poll timer
+                self.history_data.insert(0, {
+                    "timestamp": metadata.get("timestamp", ""),
+                    "agent_id": metadata.get("agent_id", "N/A"),
+                    "source_ip": metadata.get("source_ip", "N/A"),
+                    "status_code": status_code,
+                    "success": result.get("success", False),
+                    "_ts": self._epoch(metadata.get("timestamp"))
+                })
+                del self.history_data[50:]
+                try:
+                    stats, _ = await self._get_json("/api/stats")
+                    if stats is not None:
+                        self.stats = stats
+                except Exception:
+                    pass
+                self._poll_interval = 2.0
+                self.update_display()
+            else:
+                error_text = f"Failed: {response.text}"
+                self.execute_result.update(error_text)
         except Exception as e:
             self.execute_result.update(f"Error: {e}")
     
     def action_refresh(self) -> None:
+        # User-initiated: snap the poll cadence back to the floor
+        self._poll_interval = 2.0
         self.run_worker(self.refresh_data())
     
     def action_execute_request(self) -> None:
         self.execute_request()
     
     def action_configure(self) -> None:
-        self.query_one(TabbedContent).active = "config"
\ No newline at end of file
+        self._tabs.active = "config"
\ No newline at end of file